@@ -0,0 +1,126 @@
+import datetime
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from . import models
+from .database import SessionLocal, engine
+
+load_dotenv()
+
+# Returned loans older than this are moved from loans to loans_archive
+ARCHIVE_AFTER_DAYS = int(os.getenv("LOAN_ARCHIVE_AFTER_DAYS", "90"))
+# Set to 0 to disable the background job and run the archival from cron instead
+ARCHIVE_INTERVAL_HOURS = float(os.getenv("LOAN_ARCHIVE_INTERVAL_HOURS", "24"))
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def archive_returned_loans(db: Session, older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE):
+    """
+    Moves loans returned before the cutoff into loans_archive, one batch per transaction,
+    so the write lock is only held briefly. Returns the number of loans moved.
+    """
+    Loan = models.Loan
+    hot = Loan.__table__
+    cold = models.LoanArchive.__table__
+    columns = [column.name for column in hot.columns]
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=older_than_days)
+    # loans.id has no AUTOINCREMENT, so SQLite hands out max(id) + 1. Keeping the
+    # newest row in the hot table stops archived ids from being reused.
+    newest_id = db.query(func.max(Loan.id)).scalar()
+    if newest_id is None:
+        return 0
+
+    moved = 0
+    while True:
+        ids = [
+            loan_id for (loan_id,) in db.query(Loan.id)
+            .filter(Loan.return_date != None, Loan.return_date < cutoff, Loan.id < newest_id)
+            .order_by(Loan.id)
+            .limit(batch_size)
+        ]
+        if not ids:
+            break
+        db.execute(cold.insert().from_select(columns, hot.select().where(hot.c.id.in_(ids))))
+        db.query(Loan).filter(Loan.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        moved += len(ids)
+    return moved
+
+
+def history_query(db: Session, column_names, **equals):
+    """
+    Query over both loans and loans_archive for the given columns.
+    Keyword arguments are equality filters applied to each side before the union,
+    so they can still use the tables' indexes.
+    """
+    parts = []
+    for table in (models.Loan.__table__, models.LoanArchive.__table__):
+        query = db.query(*[table.c[name] for name in column_names])
+        for name, value in equals.items():
+            query = query.filter(table.c[name] == value)
+        parts.append(query)
+    return parts[0].union_all(parts[1])
+
+
+def _open_lock_file():
+    return open(os.path.join(os.path.dirname(os.path.abspath(engine.url.database)), ".loan-archiver.lock"), "a+")
+
+
+def _try_lock(handle):
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _run_periodically(interval_seconds: float):
+    # Every worker starts this loop, but only the one holding the lock file archives.
+    # The OS releases the lock if that worker dies, and another one takes over.
+    lock_file = _open_lock_file()
+    has_lock = False
+    while True:
+        has_lock = has_lock or _try_lock(lock_file)
+        if not has_lock:
+            time.sleep(interval_seconds)
+            continue
+        db = SessionLocal()
+        try:
+            moved = archive_returned_loans(db)
+            if moved:
+                print(f"Archived {moved} returned loans.")
+        except Exception as e:
+            db.rollback()
+            print(f"Loan archival failed: {e}")
+        finally:
+            db.close()
+        time.sleep(interval_seconds)
+
+
+def start_scheduler():
+    if ARCHIVE_INTERVAL_HOURS <= 0:
+        return
+    thread = threading.Thread(
+        target=_run_periodically, args=(ARCHIVE_INTERVAL_HOURS * 3600,), name="loan-archiver", daemon=True
+    )
+    thread.start()
+
+
+if __name__ == "__main__":
+    models.Base.metadata.create_all(bind=engine)
+    if not _try_lock(_open_lock_file()):
+        raise SystemExit("Loan archival is already running in another process.")
+    db = SessionLocal()
+    try:
+        print(f"Archiving loans returned more than {ARCHIVE_AFTER_DAYS} days ago...")
+        print(f"Archived {archive_returned_loans(db)} loans.")
+    finally:
+        db.close()
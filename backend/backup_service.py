@@ -0,0 +1,46 @@
+import datetime
+import os
+import sqlite3
+import sys
+from .database import engine
+
+# Pages copied per step, which is how often progress is reported. What lets the API
+# and the bot keep writing during a backup is the database's WAL mode: the backup
+# only reads, and in WAL mode readers never block writers.
+PAGES_PER_STEP = 256
+
+
+def backup(destination: str, pages: int = PAGES_PER_STEP, progress=None):
+    """
+    Copies the live SQLite database to destination using SQLite's online backup API.
+    The copy is written next to the destination first and renamed once complete,
+    so an interrupted backup never leaves a half-written file in its place.
+    """
+    if engine.url.get_backend_name() != "sqlite":
+        raise RuntimeError("Online backup is only supported for SQLite databases")
+
+    partial = destination + ".partial"
+    source = sqlite3.connect(engine.url.database)
+    target = sqlite3.connect(partial)
+    completed = False
+    try:
+        source.backup(target, pages=pages, progress=progress)
+        completed = True
+    finally:
+        target.close()
+        source.close()
+        if not completed:
+            os.remove(partial)
+    os.replace(partial, destination)
+    return destination
+
+
+def _print_progress(status, remaining, total):
+    print(f"Copied {total - remaining} of {total} pages...")
+
+
+if __name__ == "__main__":
+    destination = sys.argv[1] if len(sys.argv) > 1 else f"library-backup-{datetime.datetime.now():%Y%m%d-%H%M%S}.db"
+    print(f"Backing up {engine.url.database} to {destination}")
+    backup(destination, progress=_print_progress)
+    print("Backup complete.")
@@ -0,0 +1,237 @@
+import datetime
+from collections import defaultdict
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from . import models, archive_service
+from .database import SessionLocal, engine
+
+GRANULARITIES = ("day", "week", "month")
+BACKFILL_CHUNK_SIZE = 10000
+
+
+def _dimension_keys(book_id: int, user_id: int, author: str):
+    return [
+        ("all", ""),
+        ("book", str(book_id)),
+        ("author", author or ""),
+        ("user", str(user_id)),
+    ]
+
+
+def _bump(db: Session, day: datetime.date, dimension: str, key: str, **increments):
+    R = models.CirculationRollup
+    updated = (
+        db.query(R)
+        .filter(R.day == day, R.dimension == dimension, R.key == key)
+        .update({getattr(R, name): getattr(R, name) + value for name, value in increments.items()}, synchronize_session=False)
+    )
+    if not updated:
+        db.add(R(day=day, dimension=dimension, key=key, **{"checkouts": 0, "returns": 0, "late_returns": 0, "loan_seconds": 0, **increments}))
+
+
+def _bump_duration(db: Session, day: datetime.date, duration_days: int, count: int = 1):
+    D = models.LoanDurationRollup
+    updated = (
+        db.query(D)
+        .filter(D.day == day, D.duration_days == duration_days)
+        .update({D.count: D.count + count}, synchronize_session=False)
+    )
+    if not updated:
+        db.add(D(day=day, duration_days=duration_days, count=count))
+
+
+def _return_increments(loan_date, due_date, return_date):
+    return {
+        "returns": 1,
+        "late_returns": 1 if due_date and return_date > due_date else 0,
+        "loan_seconds": int((return_date - loan_date).total_seconds()),
+    }
+
+
+def record_checkout(db: Session, loan: models.Loan, book: models.Book):
+    """
+    Adds a new loan to the rollups. Runs inside the caller's transaction.
+    """
+    day = loan.loan_date.date()
+    for dimension, key in _dimension_keys(loan.book_id, loan.user_id, book.author):
+        _bump(db, day, dimension, key, checkouts=1)
+
+
+def record_return(db: Session, loan: models.Loan, book: models.Book):
+    day = loan.return_date.date()
+    increments = _return_increments(loan.loan_date, loan.due_date, loan.return_date)
+    for dimension, key in _dimension_keys(loan.book_id, loan.user_id, book.author):
+        _bump(db, day, dimension, key, **increments)
+    _bump_duration(db, day, (loan.return_date - loan.loan_date).days)
+
+
+def backfill(db: Session):
+    """
+    Rebuilds the rollup tables from the full loan history.
+    Loans are streamed in date order and aggregated one day at a time,
+    so memory is bounded by the number of rollup rows for a single day.
+    Run it while the API is stopped, otherwise loans made during the rebuild may be counted twice.
+    """
+    db.query(models.CirculationRollup).delete(synchronize_session=False)
+    db.query(models.LoanDurationRollup).delete(synchronize_session=False)
+    db.commit()
+
+    Loan = models.Loan
+    authors = dict(db.query(models.Book.id, models.Book.author))
+
+    # Checkouts are keyed by loan day and go straight in as fresh rows
+    checkouts = (
+        archive_service.history_query(db, ["loan_date", "book_id", "user_id"])
+        .order_by(Loan.loan_date)
+        .yield_per(BACKFILL_CHUNK_SIZE)
+    )
+    current_day, rows = None, defaultdict(int)
+    for loan_date, book_id, user_id in checkouts:
+        author = authors.get(book_id)
+        day = loan_date.date()
+        if day != current_day:
+            _insert_checkouts(db, current_day, rows)
+            current_day, rows = day, defaultdict(int)
+        for dimension, key in _dimension_keys(book_id, user_id, author):
+            rows[(dimension, key)] += 1
+    _insert_checkouts(db, current_day, rows)
+    db.commit()
+
+    # Returns land on rows that may already exist from the checkout pass
+    returns = (
+        archive_service.history_query(db, ["loan_date", "due_date", "return_date", "book_id", "user_id"])
+        .filter(Loan.return_date != None)
+        .order_by(Loan.return_date)
+        .yield_per(BACKFILL_CHUNK_SIZE)
+    )
+    current_day, rows, durations = None, defaultdict(lambda: defaultdict(int)), defaultdict(int)
+    for loan_date, due_date, return_date, book_id, user_id in returns:
+        author = authors.get(book_id)
+        day = return_date.date()
+        if day != current_day:
+            _merge_returns(db, current_day, rows, durations)
+            current_day, rows, durations = day, defaultdict(lambda: defaultdict(int)), defaultdict(int)
+        increments = _return_increments(loan_date, due_date, return_date)
+        for dimension, key in _dimension_keys(book_id, user_id, author):
+            for name, value in increments.items():
+                rows[(dimension, key)][name] += value
+        durations[(return_date - loan_date).days] += 1
+    _merge_returns(db, current_day, rows, durations)
+    db.commit()
+
+
+def _insert_checkouts(db: Session, day, rows):
+    if day is None:
+        return
+    db.bulk_insert_mappings(models.CirculationRollup, [
+        {"day": day, "dimension": dimension, "key": key, "checkouts": count, "returns": 0, "late_returns": 0, "loan_seconds": 0}
+        for (dimension, key), count in rows.items()
+    ])
+
+
+def _merge_returns(db: Session, day, rows, durations):
+    if day is None:
+        return
+    for (dimension, key), increments in rows.items():
+        _bump(db, day, dimension, key, **increments)
+    for duration_days, count in durations.items():
+        _bump_duration(db, day, duration_days, count)
+    db.flush()
+
+
+def _period_start(day: datetime.date, granularity: str) -> datetime.date:
+    if granularity == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _summarize(checkouts, returns, late_returns, loan_seconds):
+    return {
+        "checkouts": checkouts,
+        "returns": returns,
+        "average_loan_days": round(loan_seconds / returns / 86400, 2) if returns else None,
+        "overdue_rate": round(late_returns / returns, 4) if returns else None,
+    }
+
+
+def get_circulation(db: Session, start: datetime.date, end: datetime.date, granularity: str = "day", top_authors: int = 5, percentiles=()):
+    """
+    Reads circulation figures for [start, end] from the rollup tables only,
+    so the cost depends on the number of days requested, not on loan volume.
+    """
+    R = models.CirculationRollup
+    daily = (
+        db.query(R.day, R.checkouts, R.returns, R.late_returns, R.loan_seconds)
+        .filter(R.dimension == "all", R.day >= start, R.day <= end)
+        .order_by(R.day)
+        .all()
+    )
+
+    periods = {}
+    totals = [0, 0, 0, 0]
+    for day, checkouts, returns, late_returns, loan_seconds in daily:
+        bucket = periods.setdefault(_period_start(day, granularity), [0, 0, 0, 0])
+        for i, value in enumerate((checkouts, returns, late_returns, loan_seconds)):
+            bucket[i] += value
+            totals[i] += value
+
+    series = [{"period": period.isoformat(), **_summarize(*values)} for period, values in periods.items()]
+
+    result = {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "granularity": granularity,
+        "totals": _summarize(*totals),
+        "series": series,
+    }
+
+    if top_authors:
+        total_checkouts = func.sum(R.checkouts)
+        authors = (
+            db.query(R.key, total_checkouts)
+            .filter(R.dimension == "author", R.day >= start, R.day <= end)
+            .group_by(R.key)
+            .order_by(total_checkouts.desc())
+            .limit(top_authors)
+            .all()
+        )
+        result["top_authors"] = [{"author": author, "checkouts": count} for author, count in authors if count]
+
+    if percentiles:
+        result["loan_duration_percentiles"] = _duration_percentiles(db, start, end, percentiles)
+
+    return result
+
+
+def _duration_percentiles(db: Session, start: datetime.date, end: datetime.date, percentiles):
+    D = models.LoanDurationRollup
+    histogram = (
+        db.query(D.duration_days, func.sum(D.count))
+        .filter(D.day >= start, D.day <= end)
+        .group_by(D.duration_days)
+        .order_by(D.duration_days)
+        .all()
+    )
+    if not histogram:
+        return {f"{p:g}": None for p in percentiles}
+
+    values = np.array([duration for duration, _ in histogram])
+    cumulative = np.cumsum([count for _, count in histogram])
+    # Nearest-rank percentiles read off the cumulative histogram, without expanding it loan by loan
+    ranks = np.ceil(np.asarray(percentiles, dtype=float) / 100 * cumulative[-1]).clip(1, cumulative[-1])
+    positions = np.searchsorted(cumulative, ranks)
+    return {f"{p:g}": int(values[i]) for p, i in zip(percentiles, positions)}
+
+
+if __name__ == "__main__":
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        print("Rebuilding circulation rollups from loan history...")
+        backfill(db)
+        print("Done.")
+    finally:
+        db.close()
@@ -1,5 +1,7 @@
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
-from . import models, schemas
+from typing import List, Optional
+from . import models, schemas, recommendation_service, duplicate_service, circulation_service, archive_service, event_bus
 import datetime
 
 # Book CRUD
@@ -18,6 +20,9 @@ def create_book(db: Session, book: schemas.BookCreate):
     db.commit()
     db.refresh(db_book)
     db.refresh(db_book)
+    duplicate_service.record_book(db_book)
+    event_bus.publish("book.created", event_bus.book_payload(db_book))
+    event_bus.publish("stats.delta", {"total_books": 1})
     return db_book
 
 def update_book(db: Session, book_id: int, book_update: schemas.BookCreate):
@@ -27,6 +32,8 @@ def update_book(db: Session, book_id: int, book_update: schemas.BookCreate):
             setattr(db_book, key, value)
         db.commit()
         db.refresh(db_book)
+        duplicate_service.record_book(db_book)
+        event_bus.publish("book.updated", event_bus.book_payload(db_book))
     return db_book
 
 def delete_book(db: Session, book_id: int):
@@ -34,6 +41,10 @@ def delete_book(db: Session, book_id: int):
     if db_book:
         db.delete(db_book)
         db.commit()
+        recommendation_service.index.remove_book(book_id)
+        duplicate_service.remove_book(book_id)
+        event_bus.publish("book.deleted", {"id": book_id})
+        event_bus.publish("stats.delta", {"total_books": -1})
     return db_book
 
 # User CRUD
@@ -48,6 +59,7 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    event_bus.publish("stats.delta", {"total_users": 1})
     return db_user
 
 def get_users(db: Session, skip: int = 0, limit: int = 100):
@@ -67,12 +79,92 @@ def delete_user(db: Session, user_id: int):
     if db_user:
         db.delete(db_user)
         db.commit()
+        event_bus.publish("stats.delta", {"total_users": -1})
     return db_user
 
 # Loan CRUD
-def get_loans(db: Session, skip: int = 0, limit: int = 100):
+def get_loans(db: Session, skip: int = 0, limit: int = 100, include_history: bool = False):
+    if include_history:
+        # Only history requests pay for reading the archive table
+        columns = [column.name for column in models.Loan.__table__.columns]
+        return archive_service.history_query(db, columns).order_by(models.Loan.id).offset(skip).limit(limit).all()
     return db.query(models.Loan).offset(skip).limit(limit).all()
 
+def encode_board_cursor(due_date: datetime.datetime, loan_id: int):
+    return f"{due_date.isoformat()}|{loan_id}"
+
+def decode_board_cursor(cursor: str):
+    due_date, loan_id = cursor.split("|")
+    return datetime.datetime.fromisoformat(due_date), int(loan_id)
+
+def get_loan_board(
+    db: Session,
+    active: bool = True,
+    overdue: bool = False,
+    due_within_days: Optional[int] = None,
+    user_id: Optional[int] = None,
+    book_id: Optional[int] = None,
+    search: Optional[str] = None,
+    descending: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+):
+    """
+    Loans joined with their book title and user name in a single query,
+    ordered by (due_date, id) and paged by keyset so deep pages stay cheap.
+    """
+    Loan = models.Loan
+    now = datetime.datetime.utcnow()
+    query = (
+        db.query(
+            Loan.id, Loan.book_id, Loan.user_id, Loan.loan_date, Loan.due_date, Loan.return_date,
+            models.Book.title.label("book_title"), models.User.name.label("user_name"),
+        )
+        .outerjoin(models.Book, models.Book.id == Loan.book_id)
+        .outerjoin(models.User, models.User.id == Loan.user_id)
+    )
+
+    if active or overdue:
+        query = query.filter(Loan.return_date == None)
+    if overdue:
+        query = query.filter(Loan.due_date < now)
+    if due_within_days is not None:
+        query = query.filter(Loan.due_date <= now + datetime.timedelta(days=due_within_days))
+    if user_id is not None:
+        query = query.filter(Loan.user_id == user_id)
+    if book_id is not None:
+        query = query.filter(Loan.book_id == book_id)
+    if search:
+        matches = [
+            models.Book.title.contains(search, autoescape=True),
+            models.User.name.contains(search, autoescape=True),
+        ]
+        if search.isdigit():
+            matches.append(Loan.id == int(search))
+        query = query.filter(or_(*matches))
+
+    if cursor:
+        after_due, after_id = decode_board_cursor(cursor)
+        if descending:
+            query = query.filter(or_(Loan.due_date < after_due, and_(Loan.due_date == after_due, Loan.id < after_id)))
+        else:
+            query = query.filter(or_(Loan.due_date > after_due, and_(Loan.due_date == after_due, Loan.id > after_id)))
+
+    if descending:
+        query = query.order_by(Loan.due_date.desc(), Loan.id.desc())
+    else:
+        query = query.order_by(Loan.due_date, Loan.id)
+
+    # Fetch one extra row to know whether there is a next page
+    rows = query.limit(limit + 1).all()
+    page = rows[:limit]
+    items = [
+        dict(row._asdict(), is_overdue=row.return_date is None and row.due_date < now)
+        for row in page
+    ]
+    next_cursor = encode_board_cursor(page[-1].due_date, page[-1].id) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
 def create_loan(db: Session, loan: schemas.LoanCreate):
     db_loan = models.Loan(**loan.dict())
     db.add(db_loan)
@@ -82,19 +174,28 @@ def create_loan(db: Session, loan: schemas.LoanCreate):
     # Update book availability
     book = get_book(db, loan.book_id)
     book.is_available = False
+    circulation_service.record_checkout(db, db_loan, book)
     db.commit()
+
+    recommendation_service.record_loan(db, db_loan)
+    event_bus.publish("loan.created", dict(event_bus.loan_payload(db_loan), book_is_available=False))
+    event_bus.publish("stats.delta", {"active_loans": 1})
     
     return db_loan
 
 def return_book(db: Session, loan_id: int):
     loan = db.query(models.Loan).filter(models.Loan.id == loan_id).first()
-    if loan:
+    # Returning twice would free a book that may have been loaned out again since
+    if loan and loan.return_date is None:
         loan.return_date = datetime.datetime.utcnow()
         # Update book availability
         book = get_book(db, loan.book_id)
         book.is_available = True
+        circulation_service.record_return(db, loan, book)
         db.commit()
         db.refresh(loan)
+        event_bus.publish("loan.returned", dict(event_bus.loan_payload(loan), book_is_available=True))
+        event_bus.publish("stats.delta", {"active_loans": -1})
     return loan
 
 # Admin CRUD
@@ -139,3 +240,58 @@ def delete_admin(db: Session, admin_id: int):
         db.delete(db_admin)
         db.commit()
     return db_admin
+
+# Inventory Audit CRUD
+def _parse_scan(code: str):
+    code = code.strip()
+    # Anything that can't be a SQLite integer id (too long, non-ASCII digits) is kept as an unknown code
+    is_id = code.isascii() and code.isdigit() and len(code) <= 18
+    return {"code": code, "book_id": int(code) if is_id else None}
+
+def create_inventory_audit(db: Session):
+    db_audit = models.InventoryAudit()
+    db.add(db_audit)
+    db.commit()
+    db.refresh(db_audit)
+    return db_audit
+
+def get_inventory_audit(db: Session, audit_id: int):
+    return db.query(models.InventoryAudit).filter(models.InventoryAudit.id == audit_id).first()
+
+def add_inventory_scans(db: Session, audit_id: int, codes: List[str]):
+    rows = [dict(_parse_scan(code), audit_id=audit_id) for code in codes if code.strip()]
+    if rows:
+        # One executemany for the whole batch instead of a round trip per scan
+        db.execute(models.InventoryScan.__table__.insert(), rows)
+        db.commit()
+    return len(rows)
+
+def get_inventory_report(db: Session, audit_id: int):
+    Book, Scan = models.Book, models.InventoryScan
+    scanned_here = db.query(Scan.id).filter(Scan.audit_id == audit_id, Scan.book_id == Book.id).exists()
+
+    missing = db.query(Book.id, Book.title, Book.author).filter(Book.is_available == True, ~scanned_here).order_by(Book.id).all()
+    on_loan_present = db.query(Book.id, Book.title, Book.author).filter(Book.is_available == False, scanned_here).order_by(Book.id).all()
+    known_book = db.query(Book.id).filter(Book.id == Scan.book_id).exists()
+    unknown = db.query(Scan.code).filter(Scan.audit_id == audit_id, ~known_book).distinct().order_by(Scan.code).all()
+    scanned = db.query(Scan.code).filter(Scan.audit_id == audit_id).distinct().count()
+
+    return {
+        "audit_id": audit_id,
+        "scanned": scanned,
+        "missing": missing,
+        "on_loan_present": on_loan_present,
+        "unknown": [row.code for row in unknown],
+    }
+
+def complete_inventory_audit(db: Session, audit_id: int):
+    report = get_inventory_report(db, audit_id)
+    db_audit = get_inventory_audit(db, audit_id)
+    db_audit.completed_at = datetime.datetime.utcnow()
+    db_audit.scanned = report["scanned"]
+    db_audit.missing = len(report["missing"])
+    db_audit.on_loan_present = len(report["on_loan_present"])
+    db_audit.unknown = len(report["unknown"])
+    db.query(models.InventoryScan).filter(models.InventoryScan.audit_id == audit_id).delete(synchronize_session=False)
+    db.commit()
+    return report
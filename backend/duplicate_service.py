@@ -0,0 +1,215 @@
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from sqlalchemy.orm import Session
+from . import models
+from .database import SessionLocal
+
+# Trigrams shared by a large share of the catalog ("the", "ال ") say little about
+# a match and would make every lookup touch most books, so they are skipped
+# unless they are among the rarest few trigrams of the query.
+MAX_POSTING_SIZE = 500
+MIN_QUERY_GRAMS = 3
+# Only the books sharing the most trigrams are scored exactly.
+MAX_CANDIDATES = 50
+# Scored on titles alone: volumes of one series share most of their title text,
+# so anything much lower flags "Goblet of Fire" as a copy of "Chamber of Secrets".
+DEFAULT_THRESHOLD = 0.8
+# When both books have an author, the authors must also look alike. Measured as the
+# share of the shorter name's trigrams found in the other, so "Marquez" still
+# matches "Gabriel Garcia Marquez".
+MIN_AUTHOR_SCORE = 0.5
+BUILD_CHUNK_SIZE = 10000
+
+_ARABIC_FOLDING = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ة": "ه",
+    "ى": "ي",
+    "ؤ": "و",
+    "ئ": "ي",
+    "ـ": None,
+})
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(title: str, author: str = None) -> str:
+    """
+    Folds case, diacritics, Arabic letter variants and punctuation so that
+    different spellings of the same title end up with the same text.
+    """
+    text = f"{title or ''} {author or ''}".lower().translate(_ARABIC_FOLDING)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def trigrams(text: str):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _text_grams(text: str):
+    normalized = normalize(text)
+    return trigrams(normalized) if normalized else set()
+
+
+def _dice(a, b):
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _overlap(a, b):
+    return len(a & b) / min(len(a), len(b))
+
+
+class TrigramIndex:
+    """
+    In-memory inverted index from trigram to book ids over normalized titles.
+    Author trigrams are kept per book to filter and rank the title matches.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(set)
+        self._grams = {}
+        self._author_grams = {}
+        self._lock = threading.Lock()
+        self.built = False
+        # Highest book id indexed so far, used to pick up books created by other workers
+        self.max_id = 0
+
+    def build(self, db: Session):
+        postings = defaultdict(set)
+        grams = {}
+        author_grams = {}
+        max_id = 0
+        query = db.query(models.Book.id, models.Book.title, models.Book.author).yield_per(BUILD_CHUNK_SIZE)
+        for book_id, title, author in query:
+            book_grams = _text_grams(title)
+            grams[book_id] = book_grams
+            author_grams[book_id] = _text_grams(author)
+            for gram in book_grams:
+                postings[gram].add(book_id)
+            max_id = max(max_id, book_id)
+
+        with self._lock:
+            self._postings = postings
+            self._grams = grams
+            self._author_grams = author_grams
+            self.max_id = max(self.max_id, max_id)
+            self.built = True
+
+    def catch_up(self, db: Session):
+        """
+        Indexes books added since the highest indexed id, e.g. by another worker.
+        A primary key range scan, so it is cheap when there is nothing new.
+        """
+        new_books = (
+            db.query(models.Book.id, models.Book.title, models.Book.author)
+            .filter(models.Book.id > self.max_id)
+            .all()
+        )
+        for book_id, title, author in new_books:
+            self.add(book_id, title, author)
+
+    def add(self, book_id: int, title: str, author: str):
+        book_grams = _text_grams(title)
+        with self._lock:
+            self._discard(book_id)
+            self._grams[book_id] = book_grams
+            self._author_grams[book_id] = _text_grams(author)
+            for gram in book_grams:
+                self._postings[gram].add(book_id)
+            self.max_id = max(self.max_id, book_id)
+
+    def remove(self, book_id: int):
+        with self._lock:
+            self._discard(book_id)
+
+    def _discard(self, book_id: int):
+        self._author_grams.pop(book_id, None)
+        for gram in self._grams.pop(book_id, ()):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(book_id)
+                if not posting:
+                    del self._postings[gram]
+
+    def search(self, title: str, author: str = None, limit: int = 5, threshold: float = DEFAULT_THRESHOLD, exclude_id: int = None):
+        query_grams = _text_grams(title)
+        if not query_grams:
+            return []
+        query_author_grams = _text_grams(author)
+
+        with self._lock:
+            postings = sorted(
+                (self._postings[gram] for gram in query_grams if gram in self._postings),
+                key=len,
+            )
+            shared = Counter()
+            for position, posting in enumerate(postings):
+                if position >= MIN_QUERY_GRAMS and len(posting) > MAX_POSTING_SIZE:
+                    break
+                shared.update(posting)
+            shared.pop(exclude_id, None)
+
+            matches = []
+            for book_id, _ in shared.most_common(MAX_CANDIDATES):
+                # Dice coefficient over the title trigram sets
+                score = _dice(query_grams, self._grams[book_id])
+                if score < threshold:
+                    continue
+                book_author_grams = self._author_grams[book_id]
+                author_score = _overlap(query_author_grams, book_author_grams) if query_author_grams and book_author_grams else 0.0
+                if query_author_grams and book_author_grams and author_score < MIN_AUTHOR_SCORE:
+                    continue
+                matches.append((book_id, score, author_score))
+
+        # Equal titles are ranked by how close the authors are
+        matches.sort(key=lambda item: (item[1], item[2]), reverse=True)
+        return [(book_id, score) for book_id, score, _ in matches[:limit]]
+
+
+index = TrigramIndex()
+
+
+def _build_in_background():
+    db = SessionLocal()
+    try:
+        index.build(db)
+    except Exception as e:
+        print(f"Duplicate index build failed: {e}")
+    finally:
+        db.close()
+
+
+def start_builder():
+    """
+    Builds the index in a background thread at startup so no request pays for it.
+    """
+    threading.Thread(target=_build_in_background, name="duplicate-index", daemon=True).start()
+
+
+def record_book(book: models.Book):
+    if index.built:
+        index.add(book.id, book.title, book.author)
+
+
+def remove_book(book_id: int):
+    if index.built:
+        index.remove(book_id)
+
+
+def find_duplicates(db: Session, title: str, author: str = None, limit: int = 5, exclude_id: int = None):
+    if not index.built:
+        # Still building at startup; better to miss a duplicate than to block book creation
+        return []
+    index.catch_up(db)
+    matches = index.search(title, author, limit=limit, exclude_id=exclude_id)
+    if not matches:
+        return []
+    books = {book.id: book for book in db.query(models.Book).filter(models.Book.id.in_([book_id for book_id, _ in matches])).all()}
+    return [
+        {"id": book_id, "title": books[book_id].title, "author": books[book_id].author, "isbn": books[book_id].isbn, "score": round(score, 3)}
+        for book_id, score in matches
+        if book_id in books
+    ]
@@ -0,0 +1,173 @@
+import asyncio
+import datetime
+import json
+import secrets
+import threading
+from collections import deque
+
+# Recent events kept so reconnecting clients can resume from their last event id
+HISTORY_SIZE = 1000
+# Events buffered per client before it is considered too slow and told to resync
+CLIENT_BUFFER_SIZE = 100
+HEARTBEAT_SECONDS = 15
+# Event ids are "<boot id>-<n>", so an id from another worker or an earlier run
+# can never be mistaken for one of ours.
+BOOT_ID = secrets.token_hex(6)
+
+
+class Subscriber:
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=CLIENT_BUFFER_SIZE)
+        self.lagged = False
+
+    def offer(self, event):
+        # Runs on the subscriber's event loop. Publishers never wait for a slow client:
+        # once its buffer is full it stops receiving deltas until it has resynced.
+        if self.lagged:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+    def take_reset(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.lagged = False
+
+
+class EventBus:
+    """
+    In-process pub/sub for change events. Publishing is thread-safe, so the
+    sync crud functions (run in FastAPI's threadpool) can publish directly.
+    """
+
+    def __init__(self, history_size: int = HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history_size)
+        self._last_id = 0
+        self._subscribers = set()
+
+    @property
+    def last_id(self):
+        return f"{BOOT_ID}-{self._last_id}"
+
+    def _parse_id(self, event_id: str):
+        """
+        Returns the sequence number of an id issued by this process, or None.
+        """
+        boot_id, _, number = event_id.rpartition("-")
+        if boot_id != BOOT_ID or not number.isdigit():
+            return None
+        return int(number)
+
+    def publish(self, event_type: str, data: dict):
+        with self._lock:
+            self._last_id += 1
+            event = {"id": f"{BOOT_ID}-{self._last_id}", "type": event_type, "data": data}
+            self._history.append((self._last_id, event))
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscriber)
+        return event
+
+    def subscribe(self, last_event_id: str = None):
+        """
+        Registers a subscriber on the running event loop. Returns it together with
+        the id its stream starts from and the events it missed since last_event_id,
+        or None if they are no longer in history, or the id came from another process,
+        and the client has to reload its lists.
+        """
+        subscriber = Subscriber(asyncio.get_running_loop())
+        last_seq = self._parse_id(last_event_id) if last_event_id is not None else None
+        with self._lock:
+            self._subscribers.add(subscriber)
+            # Reconnecting with the client's own id replays the same backlog or reset
+            start_id = last_event_id if last_event_id is not None else self.last_id
+            if last_event_id is None or last_seq == self._last_id:
+                backlog = []
+            elif last_seq is not None and last_seq < self._last_id and last_seq >= self._history[0][0] - 1:
+                backlog = [event for seq, event in self._history if seq > last_seq]
+            else:
+                backlog = None
+        return subscriber, start_id, backlog
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    async def listen(self, last_event_id: str = None):
+        """
+        Yields events for one client, or None when a heartbeat is due.
+        The first event is always a "hello" carrying the id to resume from, so a
+        client that drops before any change still reconnects without missing one.
+        A "reset" event means deltas were lost and the client should re-fetch.
+        """
+        subscriber, start_id, backlog = self.subscribe(last_event_id)
+        try:
+            yield {"id": start_id, "type": "hello", "data": {}}
+            if backlog is None:
+                yield self._reset_event()
+            else:
+                for event in backlog:
+                    yield event
+
+            while True:
+                if subscriber.lagged:
+                    subscriber.take_reset()
+                    yield self._reset_event()
+                    continue
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield event
+        finally:
+            self.unsubscribe(subscriber)
+
+    def _reset_event(self):
+        return {"id": self.last_id, "type": "reset", "data": {}}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def to_json(event: dict) -> str:
+    return json.dumps(event, default=_json_default, ensure_ascii=False)
+
+
+bus = EventBus()
+
+
+def publish(event_type: str, data: dict):
+    return bus.publish(event_type, data)
+
+
+def book_payload(book):
+    return {
+        "id": book.id,
+        "title": book.title,
+        "author": book.author,
+        "isbn": book.isbn,
+        "is_available": book.is_available,
+    }
+
+
+def loan_payload(loan):
+    return {
+        "id": loan.id,
+        "book_id": loan.book_id,
+        "user_id": loan.user_id,
+        "loan_date": loan.loan_date,
+        "due_date": loan.due_date,
+        "return_date": loan.return_date,
+    }
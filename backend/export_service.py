@@ -0,0 +1,180 @@
+import argparse
+import csv
+import datetime
+import io
+import json
+import sys
+from sqlalchemy import union_all
+from . import models
+from .database import engine
+
+CHUNK_SIZE = 1000
+
+EXPORT_TABLES = {
+    "books": models.Book.__table__,
+    "users": models.User.__table__,
+    "loans": models.Loan.__table__,
+}
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class ExportError(Exception):
+    pass
+
+
+def check_export(table_name: str, fmt: str):
+    if table_name not in EXPORT_TABLES:
+        raise ExportError(f"Unknown table '{table_name}'. Choose one of: {', '.join(EXPORT_TABLES)}")
+    if fmt not in MEDIA_TYPES:
+        raise ExportError(f"Unknown format '{fmt}'. Choose one of: {', '.join(MEDIA_TYPES)}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportError("Parquet export requires the pyarrow package")
+
+
+def _export_query(table_name: str):
+    table = EXPORT_TABLES[table_name]
+    if table_name == "loans":
+        # Exports cover the full history, including loans moved to the archive
+        return union_all(table.select(), models.LoanArchive.__table__.select()).order_by(table.c.id)
+    return table.select().order_by(table.c.id)
+
+
+def iter_chunks(table_name: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Yields (columns, rows) chunks from a server-side cursor so only one chunk
+    is ever held in memory. Uses its own connection because it outlives the request's session.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(_export_query(table_name))
+        columns = list(result.keys())
+        while True:
+            rows = result.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield columns, rows
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _csv_chunks(chunks):
+    header_written = False
+    for columns, rows in chunks:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _jsonl_chunks(chunks):
+    for columns, rows in chunks:
+        lines = [json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) for row in rows]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink:
+    """
+    Write-only file object that hands whatever pyarrow has written so far back to the generator.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet_chunks(table_name, chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = EXPORT_TABLES[table_name]
+    types = {
+        "INTEGER": pa.int64(),
+        "BOOLEAN": pa.bool_(),
+        "DATETIME": pa.timestamp("us"),
+    }
+    schema = pa.schema([(column.name, types.get(str(column.type), pa.string())) for column in table.columns])
+
+    sink = _ChunkSink()
+    # Each chunk becomes one row group, flushed to the client as soon as it is written
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema) as writer:
+        for columns, rows in chunks:
+            batch = pa.Table.from_pylist([dict(zip(columns, row)) for row in rows], schema=schema)
+            writer.write_table(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export(table_name: str, fmt: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Returns a generator of encoded byte chunks for the whole table.
+    """
+    check_export(table_name, fmt)
+    chunks = iter_chunks(table_name, chunk_size)
+    if fmt == "csv":
+        return _csv_chunks(chunks)
+    if fmt == "jsonl":
+        return _jsonl_chunks(chunks)
+    return _parquet_chunks(table_name, chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export library tables without loading them into memory.")
+    parser.add_argument("table", choices=list(EXPORT_TABLES))
+    parser.add_argument("--format", default="csv", choices=list(MEDIA_TYPES))
+    parser.add_argument("--output", help="Output file (defaults to stdout)")
+    args = parser.parse_args()
+
+    try:
+        chunks = export(args.table, args.format)
+    except ExportError as e:
+        parser.error(str(e))
+
+    if args.output:
+        with open(args.output, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        print(f"Exported {args.table} to {args.output}")
+    else:
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .database import engine
-from . import models
-from .routers import books, users, loans, stats, auth, admins
+from . import models, archive_service, recommendation_service, duplicate_service
+from .routers import books, users, loans, stats, auth, admins, exports, inventory, events
 
 models.Base.metadata.create_all(bind=engine)
+# create_all skips tables that already exist, so indexes added to them later are created here
+for index in models.Loan.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
 
 app = FastAPI(title="AI Library System")
 
@@ -25,6 +28,15 @@ app.include_router(loans.router)
 app.include_router(stats.router)
 app.include_router(auth.router)
 app.include_router(admins.router)
+app.include_router(exports.router)
+app.include_router(inventory.router)
+app.include_router(events.router)
+
+@app.on_event("startup")
+def start_background_jobs():
+    archive_service.start_scheduler()
+    recommendation_service.start_refresher()
+    duplicate_service.start_builder()
 
 @app.get("/")
 def read_root():
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Date, Text, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 import datetime
@@ -33,14 +33,25 @@ class Loan(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     book_id = Column(Integer, ForeignKey("books.id"))
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     loan_date = Column(DateTime, default=datetime.datetime.utcnow)
-    due_date = Column(DateTime)
+    due_date = Column(DateTime, index=True)
     return_date = Column(DateTime, nullable=True)
     
     book = relationship("Book", back_populates="loans")
     user = relationship("User", back_populates="loans")
 
+class LoanArchive(Base):
+    __tablename__ = "loans_archive"
+
+    # Same columns as loans; holds loans returned long enough ago to be moved out of the hot table
+    id = Column(Integer, primary_key=True, index=True)
+    book_id = Column(Integer, ForeignKey("books.id"), index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    loan_date = Column(DateTime)
+    due_date = Column(DateTime)
+    return_date = Column(DateTime, nullable=True)
+
 class Admin(Base):
     __tablename__ = "admins"
 
@@ -49,3 +60,47 @@ class Admin(Base):
     hashed_password = Column(String)
     name = Column(String)
     is_superadmin = Column(Boolean, default=False)
+
+class InventoryAudit(Base):
+    __tablename__ = "inventory_audits"
+
+    id = Column(Integer, primary_key=True, index=True)
+    started_at = Column(DateTime, default=datetime.datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+    # Filled in when the audit is completed and its scans are cleared
+    scanned = Column(Integer, nullable=True)
+    missing = Column(Integer, nullable=True)
+    on_loan_present = Column(Integer, nullable=True)
+    unknown = Column(Integer, nullable=True)
+
+class InventoryScan(Base):
+    __tablename__ = "inventory_scans"
+
+    # Staging rows for an open audit, deleted once the audit is completed
+    id = Column(Integer, primary_key=True)
+    audit_id = Column(Integer, ForeignKey("inventory_audits.id"), index=True)
+    code = Column(String)
+    book_id = Column(Integer, nullable=True)
+
+Index("ix_inventory_scans_audit_book", InventoryScan.audit_id, InventoryScan.book_id)
+
+class CirculationRollup(Base):
+    __tablename__ = "circulation_rollups"
+
+    # One row per day and per book / author / user, plus dimension "all" for library-wide totals.
+    # Dimension leads the primary key so a date range read for one dimension skips all the others.
+    dimension = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    key = Column(String, primary_key=True)
+    checkouts = Column(Integer, default=0)
+    returns = Column(Integer, default=0)
+    late_returns = Column(Integer, default=0)
+    loan_seconds = Column(Integer, default=0)
+
+class LoanDurationRollup(Base):
+    __tablename__ = "loan_duration_rollups"
+
+    # Histogram of returned loans by whole days borrowed, keyed by return day
+    day = Column(Date, primary_key=True)
+    duration_days = Column(Integer, primary_key=True)
+    count = Column(Integer, default=0)
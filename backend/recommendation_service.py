@@ -0,0 +1,188 @@
+import heapq
+import os
+import threading
+import time
+from collections import defaultdict
+from dotenv import load_dotenv
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from . import models, archive_service
+from .database import SessionLocal
+
+load_dotenv()
+
+# Only the strongest neighbours of each book are kept, which bounds memory to
+# roughly (number of books * MAX_NEIGHBORS) counters no matter how many loans exist.
+MAX_NEIGHBORS = 100
+# Readers with very long histories would otherwise add a quadratic number of pairs.
+MAX_USER_HISTORY = 200
+BUILD_CHUNK_SIZE = 10000
+# Loans made through other workers or the bot are picked up by id on this interval
+CATCH_UP_INTERVAL_SECONDS = float(os.getenv("RECOMMENDATION_CATCH_UP_SECONDS", "30"))
+
+
+class CoOccurrenceIndex:
+    """
+    Sparse book x book matrix of "borrowed by the same reader" counts.
+    Stored as a dict of dicts (one row per book) so it can be built in a single
+    streaming pass over the loans table and updated in place on every new loan.
+    """
+
+    def __init__(self):
+        self._rows = defaultdict(dict)
+        self._lock = threading.Lock()
+        # Serializes catch-ups so no loan is counted twice
+        self._catch_up_lock = threading.Lock()
+        self.built_at = None
+        # Highest loan id counted so far
+        self.last_loan_id = 0
+
+    def build(self, db: Session):
+        rows = defaultdict(dict)
+        current_user = None
+        history = []
+
+        # Loans made while the build runs are left to catch_up, which finds them by id.
+        # The archiver never moves the newest loan, so its id is the highest in either table.
+        last_loan_id = db.query(func.max(models.Loan.id)).scalar() or 0
+        query = (
+            archive_service.history_query(db, ["id", "user_id", "book_id", "loan_date"])
+            .filter(models.Loan.id <= last_loan_id)
+            .order_by(models.Loan.user_id, models.Loan.loan_date.desc())
+            .yield_per(BUILD_CHUNK_SIZE)
+        )
+        for _, user_id, book_id, _ in query:
+            if user_id != current_user:
+                current_user = user_id
+                history = []
+            if book_id in history or len(history) >= MAX_USER_HISTORY:
+                continue
+            for other_id in history:
+                _increment(rows, book_id, other_id)
+                _increment(rows, other_id, book_id)
+            history.append(book_id)
+
+        for row in rows.values():
+            _prune(row)
+
+        with self._lock:
+            self._rows = rows
+            self.last_loan_id = last_loan_id
+            self.built_at = time.time()
+
+    def catch_up(self, db: Session):
+        """
+        Counts loans made since the highest counted id, by any process.
+        A primary key range scan, so it is cheap when there is nothing new.
+        """
+        with self._catch_up_lock:
+            new_loans = (
+                db.query(models.Loan.id, models.Loan.user_id, models.Loan.book_id)
+                .filter(models.Loan.id > self.last_loan_id)
+                .order_by(models.Loan.id)
+                .all()
+            )
+            for loan_id, user_id, book_id in new_loans:
+                previous = _previous_books(db, loan_id, user_id, book_id)
+                if previous:
+                    self.record_loan(book_id, previous)
+                self.last_loan_id = loan_id
+
+    def record_loan(self, book_id: int, previous_book_ids):
+        with self._lock:
+            for other_id in previous_book_ids:
+                if other_id == book_id:
+                    continue
+                _increment(self._rows, book_id, other_id)
+                _increment(self._rows, other_id, book_id)
+
+    def remove_book(self, book_id: int):
+        with self._lock:
+            row = self._rows.pop(book_id, {})
+            for other_id in row:
+                self._rows.get(other_id, {}).pop(book_id, None)
+
+    def top_k(self, book_id: int, k: int = 10):
+        with self._lock:
+            row = self._rows.get(book_id)
+            if not row:
+                return []
+            return heapq.nlargest(k, row.items(), key=lambda item: item[1])
+
+
+def _increment(rows, book_id, other_id):
+    row = rows[book_id]
+    row[other_id] = row.get(other_id, 0) + 1
+    # Let rows overshoot a little so pruning is amortised rather than done on every insert
+    if len(row) > 2 * MAX_NEIGHBORS:
+        _prune(row)
+
+
+def _prune(row):
+    if len(row) <= MAX_NEIGHBORS:
+        return
+    keep = heapq.nlargest(MAX_NEIGHBORS, row.items(), key=lambda item: item[1])
+    row.clear()
+    row.update(keep)
+
+
+def _previous_books(db: Session, loan_id: int, user_id: int, book_id: int):
+    """
+    The reader's most recent distinct books before this loan, the same ones a build pairs it with.
+    Empty when they borrowed this book before, since a re-borrow doesn't make it any more similar.
+    """
+    earlier = archive_service.history_query(db, ["id", "book_id", "loan_date"], user_id=user_id).filter(models.Loan.id < loan_id)
+    if earlier.filter(models.Loan.book_id == book_id).first():
+        return []
+    previous = []
+    for _, other_id, _ in earlier.order_by(models.Loan.loan_date.desc()).yield_per(MAX_USER_HISTORY):
+        if other_id not in previous:
+            previous.append(other_id)
+            if len(previous) >= MAX_USER_HISTORY - 1:
+                break
+    return previous
+
+
+index = CoOccurrenceIndex()
+
+
+def _keep_up_to_date(interval_seconds: float):
+    while True:
+        db = SessionLocal()
+        try:
+            if index.built_at is None:
+                index.build(db)
+            index.catch_up(db)
+        except Exception as e:
+            print(f"Recommendation index update failed: {e}")
+        finally:
+            db.close()
+        time.sleep(interval_seconds)
+
+
+def start_refresher():
+    """
+    Builds the index once in a background thread at startup, so requests never pay
+    for a build, then keeps it current by catching up on new loans by id.
+    """
+    thread = threading.Thread(
+        target=_keep_up_to_date, args=(CATCH_UP_INTERVAL_SECONDS,), name="recommendation-index", daemon=True
+    )
+    thread.start()
+
+
+def record_loan(db: Session, loan: models.Loan):
+    if index.built_at is None:
+        # The catch-up right after the first build will count this loan
+        return
+    index.catch_up(db)
+
+
+def get_similar_books(db: Session, book_id: int, limit: int = 10):
+    # Until the first background build finishes there is simply nothing to recommend
+    ranked = index.top_k(book_id, limit)
+    if not ranked:
+        return []
+    ids = [other_id for other_id, _ in ranked]
+    books = {book.id: book for book in db.query(models.Book).filter(models.Book.id.in_(ids)).all()}
+    return [books[other_id] for other_id in ids if other_id in books]
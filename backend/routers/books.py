@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List
-from .. import crud, models, schemas, database, ai_service, qr_service
+from .. import crud, models, schemas, database, ai_service, qr_service, recommendation_service, duplicate_service
 import shutil
 
 router = APIRouter(
@@ -9,7 +9,7 @@ router = APIRouter(
     tags=["books"],
 )
 
-@router.post("/", response_model=schemas.Book)
+@router.post("/", response_model=schemas.BookCreated)
 def create_book(book: schemas.BookCreate, db: Session = Depends(database.get_db)):
     # Generate QR Code
     # For simplicity, we use ISBN or Title as data
@@ -27,8 +27,12 @@ def create_book(book: schemas.BookCreate, db: Session = Depends(database.get_db)
     # Handle empty ISBN to avoid unique constraint violation on empty strings
     if book.isbn == "":
         book.isbn = None
-        
-    return crud.create_book(db=db, book=book)
+
+    # Look up near-duplicates before inserting so the new book doesn't match itself
+    duplicates = duplicate_service.find_duplicates(db, book.title, book.author)
+    db_book = crud.create_book(db=db, book=book)
+    db_book.possible_duplicates = duplicates
+    return db_book
 
 @router.get("/", response_model=List[schemas.Book])
 def read_books(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
@@ -43,10 +47,12 @@ def read_book(book_id: int, db: Session = Depends(database.get_db)):
     return db_book
 
 @router.post("/analyze")
-async def analyze_book_cover(file: UploadFile = File(...)):
+async def analyze_book_cover(file: UploadFile = File(...), db: Session = Depends(database.get_db)):
     contents = await file.read()
     # Call AI Service
     result = ai_service.analyze_book_cover(contents)
+    if isinstance(result, dict) and result.get("title"):
+        result["possible_duplicates"] = duplicate_service.find_duplicates(db, result["title"], result.get("author"))
     return result
 
 @router.get("/{book_id}/qr")
@@ -62,6 +68,14 @@ def get_book_qr(book_id: int, db: Session = Depends(database.get_db)):
     qr_image = qr_service.generate_qr_code(data)
     return {"qr_image": qr_image}
 
+@router.get("/{book_id}/similar", response_model=List[schemas.Book])
+def read_similar_books(book_id: int, limit: int = 10, db: Session = Depends(database.get_db)):
+    db_book = crud.get_book(db, book_id=book_id)
+    if db_book is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+    # Served from the precomputed co-occurrence index, not by aggregating loans per request
+    return recommendation_service.get_similar_books(db, book_id=book_id, limit=limit)
+
 @router.put("/{book_id}", response_model=schemas.Book)
 def update_book(book_id: int, book: schemas.BookCreate, db: Session = Depends(database.get_db)):
     db_book = crud.get_book(db, book_id=book_id)
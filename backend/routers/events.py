@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Header, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from .. import event_bus
+
+router = APIRouter(
+    prefix="/events",
+    tags=["events"],
+)
+
+async def sse_stream(last_event_id: Optional[str]):
+    async for event in event_bus.bus.listen(last_event_id):
+        if event is None:
+            # Comment line keeps proxies from closing an idle connection
+            yield ": keep-alive\n\n"
+        elif event["type"] == "hello":
+            # A block without data dispatches nothing but still sets the EventSource's last event id
+            yield f"retry: 3000\nid: {event['id']}\n\n"
+        else:
+            yield f"id: {event['id']}\nevent: {event['type']}\ndata: {event_bus.to_json(event['data'])}\n\n"
+
+@router.get("")
+async def stream_events(last_event_id: Optional[str] = None, last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")):
+    # EventSource sends Last-Event-ID itself when it reconnects; the query parameter is for first connects
+    resume_from = last_event_id_header if last_event_id_header is not None else last_event_id
+    return StreamingResponse(
+        sse_stream(resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, last_event_id: Optional[str] = None):
+    await websocket.accept()
+    try:
+        async for event in event_bus.bus.listen(last_event_id):
+            if event is None:
+                await websocket.send_text('{"type": "ping"}')
+            else:
+                await websocket.send_text(event_bus.to_json(event))
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from .. import export_service
+
+router = APIRouter(
+    prefix="/export",
+    tags=["export"],
+)
+
+@router.get("/{table_name}")
+def export_table(table_name: str, format: str = "csv"):
+    try:
+        chunks = export_service.export(table_name, format)
+    except export_service.ExportError as e:
+        status_code = 404 if table_name not in export_service.EXPORT_TABLES else 400
+        raise HTTPException(status_code=status_code, detail=str(e))
+
+    return StreamingResponse(
+        chunks,
+        media_type=export_service.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table_name}.{format}"'},
+    )
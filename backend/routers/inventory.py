@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+from .. import crud, models, schemas, database
+
+router = APIRouter(
+    prefix="/inventory",
+    tags=["inventory"],
+)
+
+def get_open_audit(audit_id: int, db: Session):
+    db_audit = crud.get_inventory_audit(db, audit_id=audit_id)
+    if db_audit is None:
+        raise HTTPException(status_code=404, detail="Audit not found")
+    if db_audit.completed_at is not None:
+        raise HTTPException(status_code=400, detail="Audit is already completed")
+    return db_audit
+
+@router.post("/audits", response_model=schemas.InventoryAudit)
+def create_audit(batch: Optional[schemas.InventoryScanBatch] = None, db: Session = Depends(database.get_db)):
+    db_audit = crud.create_inventory_audit(db)
+    if batch and batch.codes:
+        crud.add_inventory_scans(db, audit_id=db_audit.id, codes=batch.codes)
+    return db_audit
+
+@router.get("/audits/{audit_id}", response_model=schemas.InventoryAudit)
+def read_audit(audit_id: int, db: Session = Depends(database.get_db)):
+    db_audit = crud.get_inventory_audit(db, audit_id=audit_id)
+    if db_audit is None:
+        raise HTTPException(status_code=404, detail="Audit not found")
+    return db_audit
+
+@router.post("/audits/{audit_id}/scans")
+def add_scans(audit_id: int, batch: schemas.InventoryScanBatch, db: Session = Depends(database.get_db)):
+    get_open_audit(audit_id, db)
+    received = crud.add_inventory_scans(db, audit_id=audit_id, codes=batch.codes)
+    return {"audit_id": audit_id, "received": received}
+
+@router.get("/audits/{audit_id}/report", response_model=schemas.InventoryReport)
+def read_report(audit_id: int, db: Session = Depends(database.get_db)):
+    get_open_audit(audit_id, db)
+    return crud.get_inventory_report(db, audit_id=audit_id)
+
+@router.post("/audits/{audit_id}/complete", response_model=schemas.InventoryReport)
+def complete_audit(audit_id: int, db: Session = Depends(database.get_db)):
+    get_open_audit(audit_id, db)
+    return crud.complete_inventory_audit(db, audit_id=audit_id)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from .. import crud, models, schemas, database
 
 router = APIRouter(
@@ -20,10 +20,46 @@ def create_loan(loan: schemas.LoanCreate, db: Session = Depends(database.get_db)
     return crud.create_loan(db=db, loan=loan)
 
 @router.get("/", response_model=List[schemas.Loan])
-def read_loans(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    loans = crud.get_loans(db, skip=skip, limit=limit)
+def read_loans(skip: int = 0, limit: int = 100, history: bool = False, db: Session = Depends(database.get_db)):
+    loans = crud.get_loans(db, skip=skip, limit=limit, include_history=history)
     return loans
 
+@router.get("/board", response_model=schemas.LoanBoardPage)
+def read_loan_board(
+    active: bool = True,
+    overdue: bool = False,
+    due_within_days: Optional[int] = None,
+    user_id: Optional[int] = None,
+    book_id: Optional[int] = None,
+    search: Optional[str] = None,
+    order: str = "asc",
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    db: Session = Depends(database.get_db),
+):
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    if limit < 1 or limit > 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    if cursor:
+        try:
+            crud.decode_board_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return crud.get_loan_board(
+        db,
+        active=active,
+        overdue=overdue,
+        due_within_days=due_within_days,
+        user_id=user_id,
+        book_id=book_id,
+        search=search.strip() if search else None,
+        descending=order == "desc",
+        cursor=cursor,
+        limit=limit,
+    )
+
 @router.put("/{loan_id}/return", response_model=schemas.Loan)
 def return_book(loan_id: int, db: Session = Depends(database.get_db)):
     loan = crud.return_book(db, loan_id=loan_id)
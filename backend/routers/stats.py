@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from .. import crud, models, database
+from typing import List, Optional
+from datetime import date, datetime, timedelta
+from .. import crud, models, database, circulation_service
 
 router = APIRouter(
     prefix="/stats",
@@ -19,3 +21,29 @@ def get_stats(db: Session = Depends(database.get_db)):
         "total_users": total_users,
         "active_loans": active_loans
     }
+
+@router.get("/circulation")
+def get_circulation(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    granularity: str = "day",
+    top_authors: int = 5,
+    percentiles: List[float] = Query([]),
+    db: Session = Depends(database.get_db),
+):
+    if granularity not in circulation_service.GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(circulation_service.GRANULARITIES)}")
+    if any(p < 0 or p > 100 for p in percentiles):
+        raise HTTPException(status_code=400, detail="percentiles must be between 0 and 100")
+    if top_authors < 0:
+        raise HTTPException(status_code=400, detail="top_authors must not be negative")
+
+    # Rollups are bucketed by UTC day
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    return circulation_service.get_circulation(
+        db, start=start, end=end, granularity=granularity, top_authors=top_authors, percentiles=percentiles
+    )
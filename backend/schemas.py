@@ -21,6 +21,16 @@ class Book(BookBase):
     class Config:
         orm_mode = True
 
+class DuplicateCandidate(BaseModel):
+    id: int
+    title: str
+    author: str
+    isbn: Optional[str] = None
+    score: float
+
+class BookCreated(Book):
+    possible_duplicates: List[DuplicateCandidate] = []
+
 # User Schemas
 class UserBase(BaseModel):
     name: str
@@ -55,6 +65,21 @@ class Loan(LoanBase):
     class Config:
         orm_mode = True
 
+class LoanBoardEntry(BaseModel):
+    id: int
+    book_id: int
+    user_id: int
+    book_title: Optional[str] = None
+    user_name: Optional[str] = None
+    loan_date: datetime
+    due_date: datetime
+    return_date: Optional[datetime] = None
+    is_overdue: bool
+
+class LoanBoardPage(BaseModel):
+    items: List[LoanBoardEntry]
+    next_cursor: Optional[str] = None
+
 # Admin Schemas
 class AdminBase(BaseModel):
     email: str
@@ -75,6 +100,37 @@ class Admin(AdminBase):
     class Config:
         orm_mode = True
 
+# Inventory Audit Schemas
+class InventoryScanBatch(BaseModel):
+    codes: List[str] = []
+
+class InventoryAudit(BaseModel):
+    id: int
+    started_at: datetime
+    completed_at: Optional[datetime] = None
+    scanned: Optional[int] = None
+    missing: Optional[int] = None
+    on_loan_present: Optional[int] = None
+    unknown: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
+class InventoryBook(BaseModel):
+    id: int
+    title: str
+    author: str
+
+    class Config:
+        orm_mode = True
+
+class InventoryReport(BaseModel):
+    audit_id: int
+    scanned: int
+    missing: List[InventoryBook]
+    on_loan_present: List[InventoryBook]
+    unknown: List[str]
+
 class Token(BaseModel):
     access_token: str
     token_type: str
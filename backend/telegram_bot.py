@@ -1,10 +1,11 @@
+import asyncio
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes
 import os
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from .database import SessionLocal
-from . import crud, models
+from . import crud, models, recommendation_service
 
 load_dotenv()
 
@@ -23,7 +24,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         'Commands:\n'
         '/search <query> - Search for books\n'
         '/register <email> - Link your account\n'
-        '/myloans - Check your active loans'
+        '/myloans - Check your active loans\n'
+        '/similar <title> - Books borrowed by readers of this book'
     )
 
 async def search(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -89,17 +91,53 @@ async def myloans(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     
     db.close()
 
+def find_similar(query: str):
+    db = SessionLocal()
+    try:
+        book = db.query(models.Book).filter(models.Book.title.contains(query)).first()
+        if not book:
+            return None, []
+        return book, recommendation_service.get_similar_books(db, book.id, limit=5)
+    finally:
+        db.close()
+
+async def similar(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = " ".join(context.args)
+    if not query:
+        await update.message.reply_text('Please provide a book title. Usage: /similar <title>')
+        return
+
+    # Database lookups run off the event loop so other commands aren't blocked
+    book, books = await asyncio.get_running_loop().run_in_executor(None, find_similar, query)
+    if not book:
+        await update.message.reply_text('No books found.')
+        return
+
+    if not books:
+        await update.message.reply_text(f'No recommendations yet for {book.title}.')
+        return
+
+    response = f"Readers of {book.title} also borrowed:\n"
+    for other in books:
+        status = "Available" if other.is_available else "Loaned"
+        response += f"- {other.title} by {other.author} ({status})\n"
+
+    await update.message.reply_text(response)
+
 def run_bot():
     if not TOKEN:
         print("Telegram Token not found.")
         return
 
+    recommendation_service.start_refresher()
+
     application = Application.builder().token(TOKEN).build()
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("search", search))
     application.add_handler(CommandHandler("register", register))
     application.add_handler(CommandHandler("myloans", myloans))
+    application.add_handler(CommandHandler("similar", similar))
 
     print("Starting Telegram Bot...")
     application.run_polling()
@@ -3,6 +3,7 @@ import api from '../api'
 
 export default function Loans() {
     const [loans, setLoans] = useState([])
+    const [nextCursor, setNextCursor] = useState(null)
     const [books, setBooks] = useState([])
     const [users, setUsers] = useState([])
     const [formData, setFormData] = useState({ book_id: '', user_id: '', due_date: '' })
@@ -22,8 +23,10 @@ export default function Loans() {
     // QR Scanner State
     const [showScanner, setShowScanner] = useState(false)
 
+    // The search text the loan list currently shows results for
+    const loanSearchRef = useRef('')
+
     useEffect(() => {
-        fetchLoans()
         fetchBooks()
         fetchUsers()
 
@@ -71,10 +74,22 @@ export default function Loans() {
         // console.warn(`Code scan error = ${error}`)
     }
 
-    const fetchLoans = async () => {
+    // Search the whole board on the server rather than only the pages already loaded
+    useEffect(() => {
+        loanSearchRef.current = loanSearch.trim()
+        const timer = setTimeout(() => fetchLoans(), 300)
+        return () => clearTimeout(timer)
+    }, [loanSearch])
+
+    // Active loans already joined with book title and user name, one page at a time
+    const fetchLoans = async (cursor = null) => {
+        const search = loanSearchRef.current
         try {
-            const response = await api.get('/loans/')
-            setLoans(response.data)
+            const response = await api.get('/loans/board', { params: { limit: 100, cursor, search: search || undefined } })
+            // A slow response for an older search must not replace the current results
+            if (search !== loanSearchRef.current) return
+            setLoans(prev => cursor ? [...prev, ...response.data.items] : response.data.items)
+            setNextCursor(response.data.next_cursor)
         } catch (error) {
             console.error("Error fetching loans:", error)
         }
@@ -189,22 +204,6 @@ export default function Loans() {
         (user.phone && user.phone.includes(userSearch))
     )
 
-    // Filter loans for the list (Active only + Search)
-    const filteredLoans = loans.filter(loan => {
-        // Hide returned loans
-        if (loan.return_date) return false
-
-        const book = books.find(b => b.id === loan.book_id)
-        const user = users.find(u => u.id === loan.user_id)
-        const searchLower = loanSearch.toLowerCase()
-
-        return (
-            loan.id.toString().includes(searchLower) ||
-            (book && book.title.toLowerCase().includes(searchLower)) ||
-            (user && user.name.toLowerCase().includes(searchLower))
-        )
-    })
-
     // Auto-select book if exact ID match
     useEffect(() => {
         const exactMatch = books.find(b => b.id.toString() === bookSearch.trim())
@@ -444,14 +443,11 @@ export default function Loans() {
                     </div>
                 </div>
                 <ul className="divide-y divide-gray-100">
-                    {filteredLoans.length === 0 ? (
+                    {loans.length === 0 ? (
                         <li className="px-6 py-10 text-center text-gray-500">لا توجد إعارات نشطة مطابقة للبحث.</li>
                     ) : (
-                        filteredLoans.map((loan) => {
-                            const isOverdue = !loan.return_date && new Date(loan.due_date) < new Date();
-                            // Find book and user details for display
-                            const book = books.find(b => b.id === loan.book_id)
-                            const user = users.find(u => u.id === loan.user_id)
+                        loans.map((loan) => {
+                            const isOverdue = loan.is_overdue
 
                             return (
                                 <li key={loan.id} className={`hover:bg-gray-50 transition-colors ${isOverdue ? "bg-red-50 hover:bg-red-100" : ""}`}>
@@ -466,9 +462,9 @@ export default function Loans() {
                                                 <div>
                                                     <p className="text-sm font-bold text-gray-900">إعارة #{loan.id}</p>
                                                     <div className="flex flex-col sm:flex-row sm:gap-4 mt-1 text-xs text-gray-500">
-                                                        <span>{book ? book.title : `كتاب ID: ${loan.book_id}`}</span>
+                                                        <span>{loan.book_title || `كتاب ID: ${loan.book_id}`}</span>
                                                         <span className="hidden sm:inline">•</span>
-                                                        <span>{user ? user.name : `مستخدم ID: ${loan.user_id}`}</span>
+                                                        <span>{loan.user_name || `مستخدم ID: ${loan.user_id}`}</span>
                                                     </div>
                                                 </div>
                                             </div>
@@ -499,6 +495,13 @@ export default function Loans() {
                         })
                     )}
                 </ul>
+                {nextCursor && (
+                    <div className="px-6 py-4 border-t border-gray-100 text-center">
+                        <button onClick={() => fetchLoans(nextCursor)} className="px-4 py-2 text-sm font-medium text-indigo-600 hover:text-indigo-800">
+                            عرض المزيد
+                        </button>
+                    </div>
+                )}
             </div >
         </div >
     )
@@ -0,0 +1,5 @@
+@echo off
+cd /d "%~dp0"
+call .venv\Scripts\activate 2>nul
+python -m backend.backup_service
+pause